@@ -2,12 +2,93 @@
 Cyber Controller connector for API interactions.
 """
 
+from __future__ import annotations
+
+import json
+import os
+import ssl
+import sys
+import threading
+import time
 import requests
-import pandas as pd
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
 import math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Dict
-from config import CONFIG
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+from config_loader import CONFIG
+from report_columns import MAX_VALUE_COLUMNS, PROTOCOLS
+
+# pandas and numpy are imported where they are used, so early failures (e.g. no active CC) exit fast
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Fall back to the ujson decoder bundled with pandas
+    def json_loads(data):
+        """Decode JSON with pandas' bundled ujson, importing pandas on first use."""
+        from pandas.io.json import ujson_loads
+        return ujson_loads(data)
+
+try:
+    import ijson
+except ImportError:  # Without ijson every response is decoded in one piece
+    ijson = None
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the session cache is then used unlocked
+    fcntl = None
+
+MAX_CONCURRENT_REQUESTS = 32  # Upper bound on in-flight max-value queries
+STREAM_PARSE_THRESHOLD = 8 * 1024 * 1024  # Stream-parse PO responses larger than this (bytes)
+# Ask the CC to pre-aggregate samples to hourly maxima; dropped if the CC rejects unknown fields
+SERVER_AGGREGATION_HINTS = {"aggregation": "MAX", "interval": "PT1H"}
+_EMPTY = {}  # Shared stand-in for POs without flow detector thresholds
+SESSION_CACHE_PATH = os.path.expanduser("~/.cc_connector_cache.json")
+SESSION_CACHE_TTL = 15 * 60  # Seconds a cached login is trusted before re-probing
+
+# CCs commonly use self-signed certificates, so verification is off; silence the per-request warning
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Max values don't change within a report window, so repeated lookups are served in-process
+_max_values_cache = TTLCache(maxsize=4096, ttl=300)
+_max_values_cache_lock = threading.Lock()
+
+
+def _log(message: str) -> None:
+    """Print a whole line in one write, so messages from worker threads don't interleave."""
+    sys.stdout.write(f"{message}\n")
+
+
+class SSLContextAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections share one prebuilt, non-verifying SSL context."""
+    
+    def __init__(self, *args, **kwargs):
+        """Build the SSL context once, before the pool manager is created."""
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+        super().__init__(*args, **kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        """Create the pool manager with the shared SSL context."""
+        kwargs["ssl_context"] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+    
+    def proxy_manager_for(self, *args, **kwargs):
+        """Create proxy managers with the shared SSL context."""
+        kwargs["ssl_context"] = self.ssl_context
+        return super().proxy_manager_for(*args, **kwargs)
+    
+    def send(self, request, **kwargs):
+        """Send without verification; REQUESTS_CA_BUNDLE would otherwise override session.verify."""
+        kwargs["verify"] = False
+        return super().send(request, **kwargs)
 
 
 class CcConnector:
@@ -15,20 +96,40 @@ class CcConnector:
     
     def __init__(self, username: str = None, password: str = None):
         """Initialize CcConnector with HA credentials."""
-        self.primary_url = CONFIG['PRIMARY_URL']
-        self.secondary_url = CONFIG['SECONDARY_URL']
-        self.username = username or CONFIG['DEFAULT_USERNAME']
-        self.password = password or CONFIG['DEFAULT_PASSWORD']
+        self.primary_url = CONFIG.PRIMARY_URL
+        self.secondary_url = CONFIG.SECONDARY_URL
+        self.username = username or CONFIG.DEFAULT_USERNAME
+        self.password = password or CONFIG.DEFAULT_PASSWORD
         self.session = requests.Session()
+        self.session.mount("https://", self._create_adapter())
         self.active_url = None  # Will be set after determining active CC
-        self.login_ha()
+        self.protocol_batching = None  # Whether the CC serves all protocols in one query; probed on first use
+        self.po_batching = None  # Whether the CC serves many POs in one query; probed on first use
+        self.aggregation_hints = True  # Whether to send SERVER_AGGREGATION_HINTS; turned off if rejected
+        # Shared worker pool for concurrent queries, reused across calls
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+        if not self._load_cached_session() and self.login_ha():
+            self._save_cached_session()
+        self.max_values_url_template = f"{self.active_url}/mgmt/vrm/top-talkers/flow-detector/{{}}"
+        # One lookback window per run, so every query covers the same period
+        self.lookback_start_ms = self._get_lookback_start_ms()
+
+    @staticmethod
+    def _create_adapter() -> HTTPAdapter:
+        """Create a pooled TLS adapter that retries transient gateway errors."""
+        # 503 is left out on purpose: an inactive HA node answers login with 503.
+        # Connection and read errors are not retried, so HA failover to an unreachable CC stays fast.
+        retries = Retry(total=3, connect=0, read=0, other=0, status=3, backoff_factor=0.3,
+                        status_forcelist=[502, 504], allowed_methods=None, raise_on_status=False)
+        # Pool is larger than the worker count so concurrent queries never discard connections
+        return SSLContextAdapter(pool_connections=16, pool_maxsize=64, max_retries=retries)
 
     def test_cc_availability(self, base_url: str) -> tuple[bool, str]:
         """Test if a CC is active by attempting login."""
         try:
             url = f"{base_url}/mgmt/system/user/login"
             payload = {"username": self.username, "password": self.password}
-            response = self.session.post(url, json=payload, verify=False, timeout=10)
+            response = self.session.post(url, json=payload, timeout=10)
             
             print(f"Testing CC: {base_url} - Status: {response.status_code}")
             
@@ -77,12 +178,72 @@ class CcConnector:
         self.active_url = None
         return False
 
+    def _load_cached_session(self) -> bool:
+        """Reuse the active CC and login cookies from the session cache if still valid."""
+        try:
+            with open(SESSION_CACHE_PATH, "r") as cache_file:
+                if fcntl:
+                    fcntl.flock(cache_file, fcntl.LOCK_SH)
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            return False
+        
+        cached_url = cache.get("url")
+        if (cache.get("expires_at", 0) <= time.time() or cache.get("username") != self.username or
+                cached_url not in (self.primary_url, self.secondary_url)):
+            return False
+        
+        # One cheap request confirms the cookies are still accepted by the cached CC
+        self.session.cookies.update(cache.get("cookies", {}))
+        try:
+            response = self.session.head(f"{cached_url}/mgmt/system/ping", timeout=10)
+            is_valid = response.status_code == 200
+        except requests.RequestException:
+            is_valid = False
+        
+        if not is_valid:
+            self.session.cookies.clear()
+            return False
+        
+        self.active_url = cached_url
+        print(f"✅ Reusing cached session for active CC: {self.active_url}")
+        return True
+    
+    def _save_cached_session(self) -> None:
+        """Persist the active CC and login cookies to the session cache."""
+        cache = {
+            "url": self.active_url,
+            "username": self.username,
+            "cookies": self.session.cookies.get_dict(),
+            "expires_at": time.time() + SESSION_CACHE_TTL
+        }
+        
+        try:
+            # Owner-only permissions since the file holds session cookies
+            fd = os.open(SESSION_CACHE_PATH, os.O_WRONLY | os.O_CREAT, 0o600)
+            if hasattr(os, "fchmod"):  # The mode above only applies when the file is created
+                os.fchmod(fd, 0o600)
+            with os.fdopen(fd, "w") as cache_file:
+                if fcntl:
+                    fcntl.flock(cache_file, fcntl.LOCK_EX)
+                cache_file.truncate()
+                json.dump(cache, cache_file)
+        except OSError as e:
+            print(f"⚠️  Could not write session cache: {e}")
+
+    def close(self) -> None:
+        """Stop the worker pool and release pooled connections."""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
     def login(self) -> bool:
         """Legacy login method for compatibility."""
         return self.active_url is not None
     
     def get_protected_objects(self) -> pd.DataFrame:
         """Retrieve protected objects and their flow detector thresholds."""
+        import pandas as pd
+        
         if not self.active_url:
             print("❌ No active Cyber Controller available")
             return pd.DataFrame()
@@ -90,20 +251,28 @@ class CcConnector:
         try:
             url = f"{self.active_url}/mgmt/v2/device/df/restv2/protected-objects/configure/security-settings/?includeNameSort=false"
             payload = {"protectedObjectNames": []}
-            response = self.session.post(url, json=payload, verify=False)
             
-            if response.status_code != 200:
-                print(f"Failed to retrieve PO data with status code: {response.status_code}")
-                if response.text:
-                    print(f"PO data error response: {response.text[:200]}...")
-                return pd.DataFrame()
-            
-            try:
-                response_json = response.json()
-            except Exception as json_error:
-                print(f"Failed to parse JSON: {json_error}")
-                print(f"Response content: {response.text[:500]}")
-                return pd.DataFrame()
+            with self.session.post(url, json=payload, stream=True) as response:
+                if response.status_code != 200:
+                    print(f"Failed to retrieve PO data with status code: {response.status_code}")
+                    if response.text:
+                        print(f"PO data error response: {response.text[:200]}...")
+                    return pd.DataFrame()
+                
+                # Large (or unknown-size) responses are parsed while they download,
+                # so the raw body and the decoded JSON are never held in memory together
+                content_length = int(response.headers.get("Content-Length") or 0)
+                if ijson is not None and (content_length == 0 or content_length > STREAM_PARSE_THRESHOLD):
+                    response.raw.decode_content = True  # Let urllib3 undo any gzip/deflate encoding
+                    po_items = ijson.items(response.raw, "protectedObjects.item", use_float=True)
+                    return self._parse_protected_objects(po_items)
+                
+                try:
+                    response_json = json_loads(response.content)
+                except ValueError as json_error:
+                    print(f"Failed to parse JSON: {json_error}")
+                    print(f"Response content: {response.text[:500]}")
+                    return pd.DataFrame()
             
             if response_json is None:
                 print("Response is not valid JSON")
@@ -117,80 +286,318 @@ class CcConnector:
     
     def _parse_protected_objects_response(self, response_json: Dict) -> pd.DataFrame:
         """Parse the protected objects API response into a DataFrame."""
-        po_details = []
-        po_data = response_json.get("protectedObjects", [])
-        
-        for po_item in po_data:
-            po_name = po_item.get("name", "")
-            flow_details = po_item.get("flowDetectorThresholdsHostDetails") or {}
-            
-            po_details.append({
-                "PO Name": po_name,
-                "PO Description": po_item.get("description", ""),
-                "TCP Activation Mbps": flow_details.get("tcpMbps", ""),
-                "TCP Activation PPS": flow_details.get("tcpPps", ""),
-                "UDP Activation Mbps": flow_details.get("udpMbps", ""),
-                "UDP Activation PPS": flow_details.get("udpPps", ""),
-                "ICMP Activation Mbps": flow_details.get("icmpMbps", ""),
-                "ICMP Activation PPS": flow_details.get("icmpPps", ""),
-                "Total Activation Mbps": flow_details.get("totalMbps", ""),
-                "Total Activation PPS": flow_details.get("totalPps", "")
-            })
-        
-        return pd.DataFrame(po_details)
-
-    def get_max_values_for_po(self, po_name: str) -> pd.DataFrame:
+        return self._parse_protected_objects(response_json.get("protectedObjects", []))
+    
+    def _parse_protected_objects(self, po_items: Iterable[Dict]) -> pd.DataFrame:
+        """Build the protected objects DataFrame column by column from PO items."""
+        import pandas as pd
+        
+        # Fill one list per column in a single pass instead of building a dict per row;
+        # po_items may be a lazy stream, so the columns grow as items arrive
+        names = []
+        descriptions = []
+        tcp_mbps = []
+        tcp_pps = []
+        udp_mbps = []
+        udp_pps = []
+        icmp_mbps = []
+        icmp_pps = []
+        total_mbps = []
+        total_pps = []
+        
+        for po_item in po_items:
+            flow_details = po_item.get("flowDetectorThresholdsHostDetails") or _EMPTY
+            names.append(po_item.get("name", ""))
+            descriptions.append(po_item.get("description", ""))
+            tcp_mbps.append(flow_details.get("tcpMbps", ""))
+            tcp_pps.append(flow_details.get("tcpPps", ""))
+            udp_mbps.append(flow_details.get("udpMbps", ""))
+            udp_pps.append(flow_details.get("udpPps", ""))
+            icmp_mbps.append(flow_details.get("icmpMbps", ""))
+            icmp_pps.append(flow_details.get("icmpPps", ""))
+            total_mbps.append(flow_details.get("totalMbps", ""))
+            total_pps.append(flow_details.get("totalPps", ""))
+        
+        return pd.DataFrame({
+            "PO Name": names,
+            "PO Description": descriptions,
+            "TCP Activation Mbps": tcp_mbps,
+            "TCP Activation PPS": tcp_pps,
+            "UDP Activation Mbps": udp_mbps,
+            "UDP Activation PPS": udp_pps,
+            "ICMP Activation Mbps": icmp_mbps,
+            "ICMP Activation PPS": icmp_pps,
+            "Total Activation Mbps": total_mbps,
+            "Total Activation PPS": total_pps
+        }, copy=False)
+
+    def get_max_values_for_po(self, po_name: str) -> Dict[str, int]:
         """Get maximum traffic values for a protected object over the last 7 days."""
-        protocols = ["tcp", "udp", "icmp", "total"]
         po_max_values = {}
+        from_ms = self.lookback_start_ms
         
-        for protocol in protocols:
-            max_values = self._get_protocol_max_values(po_name, protocol)
-            po_max_values.update(max_values)
+        if self._check_protocol_batching(po_name, from_ms):
+            po_max_values = self._get_batched_max_values(po_name, from_ms)
+        else:
+            # Query all protocols concurrently; requests.Session is shared across threads
+            results = self.executor.map(lambda protocol: self._get_protocol_max_values(po_name, protocol, from_ms), PROTOCOLS)
+            for max_values in results:
+                po_max_values.update(max_values)
         
         print(f"Max values for {po_name}: {po_max_values}")
-        return pd.DataFrame([po_max_values])
+        return po_max_values
     
-    def _get_protocol_max_values(self, po_name: str, protocol: str) -> Dict[str, int]:
-        """Get maximum BPS and PPS values for a specific protocol."""
+    def get_max_values_for_all_pos(self, po_names: Iterable[str]) -> pd.DataFrame:
+        """Get maximum traffic values for all protected objects in one concurrent batch."""
+        import pandas as pd
+        
+        po_max_values = {po_name: {} for po_name in po_names}
+        from_ms = self.lookback_start_ms
+        pending = list(po_max_values)
+        
+        if pending and self.po_batching is not False:
+            # One query per protocol covers every PO; anything it misses falls through
+            pending = self._fetch_bulk_max_values(po_max_values, from_ms)
+        
+        if pending and self._check_protocol_batching(pending[0], from_ms):
+            # One query per PO covers every protocol
+            results = self.executor.map(lambda po_name: self._get_batched_max_values(po_name, from_ms), pending)
+            for po_name, max_values in zip(pending, results):
+                po_max_values[po_name].update(max_values)
+        elif pending:
+            # Schedule every (PO, protocol) pair at once, bounded by the pool size
+            queries = [(po_name, protocol) for po_name in pending for protocol in PROTOCOLS]
+            results = self.executor.map(lambda query: self._get_protocol_max_values(*query, from_ms), queries)
+            for (po_name, _), max_values in zip(queries, results):
+                po_max_values[po_name].update(max_values)
+        
+        for po_name, max_values in po_max_values.items():
+            print(f"Max values for {po_name}: {max_values}")
+        
+        return pd.DataFrame.from_records(
+            [{"PO Name": po_name, **max_values} for po_name, max_values in po_max_values.items()],
+            columns=["PO Name"] + MAX_VALUE_COLUMNS
+        )
+    
+    @staticmethod
+    def _get_lookback_start_ms() -> int:
+        """Get the start of the lookback window as epoch milliseconds."""
+        return int((datetime.now(timezone.utc) - timedelta(days=CONFIG.DAYS_LOOKBACK)).timestamp() * 1000)
+    
+    def _fetch_bulk_max_values(self, po_max_values: Dict[str, Dict[str, int]], from_ms: int) -> list[str]:
+        """Fill po_max_values with one query per protocol for all POs; returns the POs still missing values."""
+        po_names = list(po_max_values)
+        supported, results = zip(*self.executor.map(
+            lambda protocol: self._query_bulk_max_values(po_names, protocol, from_ms), PROTOCOLS
+        ))
+        
+        # Decide once all protocols have answered; one rejection disables bulk queries
+        if False in supported:
+            self.po_batching = False
+            return po_names
+        if True in supported:
+            self.po_batching = True
+        
+        with _max_values_cache_lock:
+            for protocol, max_values_by_po in zip(PROTOCOLS, results):
+                for po_name, max_values in max_values_by_po.items():
+                    _max_values_cache[(self.active_url, po_name, protocol, CONFIG.DAYS_LOOKBACK)] = max_values
+                    po_max_values[po_name].update(max_values)
+        
+        return [po_name for po_name, max_values in po_max_values.items() if len(max_values) < len(MAX_VALUE_COLUMNS)]
+    
+    def _query_bulk_max_values(self, po_names: list[str], protocol: str,
+                               from_ms: int) -> tuple[Optional[bool], Dict[str, Dict[str, int]]]:
+        """Query one protocol for many POs; returns whether the CC supports it (None if unknown) and the values."""
         if not self.active_url:
-            print(f"❌ No active CC available for {protocol} data")
-            return {}
-            
-        url = f"{self.active_url}/mgmt/vrm/top-talkers/flow-detector/{protocol}"
+            _log(f"❌ No active CC available for {protocol} data")
+            return None, {}
+        
         payload = {
-            "protectedObjectName": po_name,
+            "protectedObjectNames": po_names,
             "timeInterval": {
-                "from": int((datetime.now(timezone.utc) - timedelta(days=CONFIG['DAYS_LOOKBACK'])).timestamp() * 1000),
+                "from": from_ms,
                 "to": None
             }
         }
         
         try:
-            response = self.session.post(url, json=payload, verify=False)
+            response = self._post_max_values_query(self.max_values_url_template.format(protocol), payload)
+            if response.status_code in (400, 404, 405):
+                return False, {}
             if response.status_code != 200:
-                print(f"Failed to retrieve {protocol} max data for PO {po_name} with status code: {response.status_code}")
-                return {}
+                _log(f"Failed to retrieve bulk {protocol} max data with status code: {response.status_code}")
+                return None, {}
+            
+            # Expect one dataMap per requested PO; a single-PO shape means the list was not understood
+            data_map = json_loads(response.content).get("dataMap") or _EMPTY
+            requested = set(po_names)
+            if ("incoming" in data_map or
+                    not all(po_name in requested and isinstance(po_data, dict) for po_name, po_data in data_map.items())):
+                return False, {}
+            # An empty answer can't tell bulk support apart from POs with no traffic
+            if not any(data_map.values()):
+                return None, {}
             
-            data_map = response.json().get("dataMap", {})
-            incoming = data_map.get("incoming", {})
+            return True, {po_name: self._extract_max_values(protocol, po_data) for po_name, po_data in data_map.items()}
             
-            bps_list = incoming.get("bps", [])
-            max_bps = max((float(item["row"]["value"]) for item in bps_list), default=0) if bps_list else 0
+        except Exception as e:
+            _log(f"Error getting bulk {protocol} max values: {e}")
+            return None, {}
+    
+    def _check_protocol_batching(self, po_name: str, from_ms: int) -> bool:
+        """Check whether the CC answers all protocols in one query, probing once with a real PO."""
+        if self.protocol_batching is None:
+            # Only the probe decides; the probed values are cached so the PO is not queried twice
+            supported, max_values_by_protocol = self._query_batched_max_values(po_name, from_ms)
+            if supported is not None:
+                self.protocol_batching = supported
+            self._store_max_values(po_name, max_values_by_protocol)
+        return bool(self.protocol_batching)
+    
+    def _get_batched_max_values(self, po_name: str, from_ms: int) -> Dict[str, int]:
+        """Get maximum BPS and PPS values for all protocols with one query, reusing recent results."""
+        cache_keys = [(self.active_url, po_name, protocol, CONFIG.DAYS_LOOKBACK) for protocol in PROTOCOLS]
+        with _max_values_cache_lock:
+            cached = [_max_values_cache.get(cache_key) for cache_key in cache_keys]
+        
+        if all(max_values is not None for max_values in cached):
+            return {key: value for max_values in cached for key, value in max_values.items()}
+        
+        supported, max_values_by_protocol = self._query_batched_max_values(po_name, from_ms)
+        po_max_values = self._store_max_values(po_name, max_values_by_protocol)
+        
+        if supported is not None:
+            # Protocols the batched answer left out (or a rejected query) are fetched one by one for this PO
+            for protocol in PROTOCOLS:
+                if protocol not in max_values_by_protocol:
+                    po_max_values.update(self._get_protocol_max_values(po_name, protocol, from_ms))
+        return po_max_values
+    
+    def _store_max_values(self, po_name: str, max_values_by_protocol: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+        """Cache per-protocol max values for a PO and return them merged into one dict."""
+        po_max_values = {}
+        with _max_values_cache_lock:
+            for protocol, max_values in max_values_by_protocol.items():
+                _max_values_cache[(self.active_url, po_name, protocol, CONFIG.DAYS_LOOKBACK)] = max_values
+                po_max_values.update(max_values)
+        return po_max_values
+    
+    def _query_batched_max_values(self, po_name: str,
+                                  from_ms: int) -> tuple[Optional[bool], Dict[str, Dict[str, int]]]:
+        """Query all protocols in one request; returns whether the CC supports it (None if unknown) and the values."""
+        if not self.active_url:
+            _log("❌ No active CC available for flow detector data")
+            return None, {}
+        
+        url = f"{self.active_url}/mgmt/vrm/top-talkers/flow-detector"
+        payload = {
+            "protectedObjectName": po_name,
+            "protocols": PROTOCOLS,
+            "timeInterval": {
+                "from": from_ms,
+                "to": None
+            }
+        }
+        
+        try:
+            response = self._post_max_values_query(url, payload)
+            if response.status_code in (400, 404, 405):
+                return False, {}
+            if response.status_code != 200:
+                _log(f"Failed to retrieve max data for PO {po_name} with status code: {response.status_code}")
+                return None, {}
             
-            pps_list = incoming.get("pps", [])
-            max_pps = max((float(item["row"]["value"]) for item in pps_list), default=0) if pps_list else 0
+            # Expect one dataMap per protocol; none at all means the field was not understood
+            data_map = json_loads(response.content).get("dataMap") or _EMPTY
+            max_values_by_protocol = {
+                protocol: self._extract_max_values(protocol, data_map[protocol])
+                for protocol in PROTOCOLS if isinstance(data_map.get(protocol), dict)
+            }
+            return bool(max_values_by_protocol), max_values_by_protocol
             
-            # Convert to Mbps and round up
-            max_bps_mbps = math.ceil(max_bps / 1024 / 1024)
-            max_pps_rounded = math.ceil(max_pps)
+        except Exception as e:
+            _log(f"Error getting batched max values for {po_name}: {e}")
+            return None, {}
+    
+    def _get_protocol_max_values(self, po_name: str, protocol: str, from_ms: int) -> Dict[str, int]:
+        """Get maximum BPS and PPS values for a specific protocol, reusing recent results."""
+        cache_key = (self.active_url, po_name, protocol, CONFIG.DAYS_LOOKBACK)
+        with _max_values_cache_lock:
+            max_values = _max_values_cache.get(cache_key)
+        
+        if max_values is None:
+            max_values = self._query_protocol_max_values(po_name, protocol, from_ms)
+            if max_values:  # Failed lookups are not cached so they are retried
+                with _max_values_cache_lock:
+                    _max_values_cache[cache_key] = max_values
+        
+        return dict(max_values)
+    
+    def _query_protocol_max_values(self, po_name: str, protocol: str, from_ms: int) -> Dict[str, int]:
+        """Query maximum BPS and PPS values for a specific protocol from the CC."""
+        if not self.active_url:
+            _log(f"❌ No active CC available for {protocol} data")
+            return {}
             
-            protocol_upper = protocol.upper()
-            return {
-                f"{protocol_upper} Max Mbps": max_bps_mbps,
-                f"{protocol_upper} Max PPS": max_pps_rounded
+        url = self.max_values_url_template.format(protocol)
+        payload = {
+            "protectedObjectName": po_name,
+            "timeInterval": {
+                "from": from_ms,
+                "to": None
             }
+        }
+        
+        try:
+            response = self._post_max_values_query(url, payload)
+            if response.status_code != 200:
+                _log(f"Failed to retrieve {protocol} max data for PO {po_name} with status code: {response.status_code}")
+                return {}
+            
+            data_map = json_loads(response.content).get("dataMap", {})
+            return self._extract_max_values(protocol, data_map)
             
         except Exception as e:
-            print(f"Error getting {protocol} max values for {po_name}: {e}")
-            return {}
\ No newline at end of file
+            _log(f"Error getting {protocol} max values for {po_name}: {e}")
+            return {}
+    
+    def _post_max_values_query(self, url: str, payload: Dict) -> requests.Response:
+        """POST a max-value query with the aggregation hints, retrying once without them on 400."""
+        if not self.aggregation_hints:
+            return self.session.post(url, json=payload)
+        
+        response = self.session.post(url, json={**payload, **SERVER_AGGREGATION_HINTS})
+        if response.status_code != 400:
+            return response
+        
+        # A CC that rejects unknown fields answers 400; if the plain query works, stop sending the hints
+        retry_response = self.session.post(url, json=payload)
+        if retry_response.status_code == 200:
+            self.aggregation_hints = False
+        return retry_response
+    
+    @staticmethod
+    def _extract_max_values(protocol: str, data_map: Dict) -> Dict[str, int]:
+        """Reduce a flow detector dataMap to the rounded-up max Mbps and PPS values."""
+        import numpy as np
+        
+        incoming = data_map.get("incoming") or _EMPTY
+        bps_list = incoming.get("bps") or ()
+        pps_list = incoming.get("pps") or ()
+        
+        # Reduce in NumPy rather than converting every sample to a Python float
+        bps_values = np.fromiter((item["row"]["value"] for item in bps_list), dtype=np.float64, count=len(bps_list))
+        pps_values = np.fromiter((item["row"]["value"] for item in pps_list), dtype=np.float64, count=len(pps_list))
+        max_bps = bps_values.max() if bps_values.size else 0.0
+        max_pps = pps_values.max() if pps_values.size else 0.0
+        
+        # Round up to whole bits, then to whole Mbps with integer math (2**20 bits per Mbps)
+        max_bps_mbps = (math.ceil(max_bps) + 0xFFFFF) >> 20
+        max_pps_rounded = math.ceil(max_pps)
+        
+        protocol_upper = protocol.upper()
+        return {
+            f"{protocol_upper} Max Mbps": max_bps_mbps,
+            f"{protocol_upper} Max PPS": max_pps_rounded
+        }
@@ -1,9 +1,10 @@
 # Example configuration file
 # Copy this to config.py and update with your actual values
 
-CONFIG = {
-    # Cyber Controller Settings
-    'BASE_URL': "https://your-cc-server-ip-or-hostname",
+SETTINGS = {
+    # Cyber Controller HA Settings
+    'PRIMARY_URL': "https://your-primary-cc-ip-or-hostname",
+    'SECONDARY_URL': "https://your-secondary-cc-ip-or-hostname",
     'DEFAULT_USERNAME': "your-username",
     'DEFAULT_PASSWORD': "your-password",
     
@@ -43,4 +44,4 @@ The report includes:
 Best regards,
 Cyber Controller Report System
 """
-}
\ No newline at end of file
+}
@@ -2,8 +2,7 @@
 Configuration settings for the Cyber Controller report generator.
 """
 
-# Configuration
-CONFIG = {
+SETTINGS = {
     # Cyber Controller HA Configuration
     'PRIMARY_URL': "https://CC-IP",    # Primary CC server
     'SECONDARY_URL': "https://CC-IP",  # Secondary CC server (backup)
@@ -44,4 +43,4 @@ The report includes:
 Best regards,
 Cyber Controller Report System
 """
-}
\ No newline at end of file
+}
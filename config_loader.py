@@ -0,0 +1,35 @@
+"""
+Loads the user's config.py into a read-only settings object.
+"""
+
+from dataclasses import dataclass
+from typing import List
+
+import config
+
+
+@dataclass(frozen=True, slots=True)
+class _Config:
+    """Read-only settings with attribute access; built from config.py."""
+    PRIMARY_URL: str
+    SECONDARY_URL: str
+    DEFAULT_USERNAME: str
+    DEFAULT_PASSWORD: str
+    DAYS_LOOKBACK: int
+    THRESHOLD_PERCENTAGE: float
+    OUTPUT_FILENAME_PREFIX: str
+    EMAIL_ENABLED: bool
+    SMTP_SERVER: str
+    SMTP_PORT: int
+    SMTP_USE_TLS: bool
+    SMTP_USERNAME: str
+    SMTP_PASSWORD: str
+    EMAIL_FROM: str
+    EMAIL_TO: List[str]
+    EMAIL_CC: List[str]
+    EMAIL_SUBJECT: str
+    EMAIL_BODY_TEMPLATE: str
+
+
+# Older config.py files define the settings as a CONFIG dict instead of SETTINGS
+CONFIG = _Config(**getattr(config, "SETTINGS", None) or config.CONFIG)
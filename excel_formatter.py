@@ -2,164 +2,159 @@
 Excel report formatter for styling and highlighting threshold violations.
 """
 
+import io
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
-from config import CONFIG
+from config_loader import CONFIG
+from report_columns import ACTIVATION_COLUMNS, MAX_VALUE_COLUMNS
+
+CURRENT_TITLE = "Current Thresholds"  # Spans columns C to J
+MAX_TITLE = "Max value for last 7 days"  # Spans columns K to R
+
+# Styles are built once at import and shared by every cell that uses them
+TITLE_FONT = Font(bold=True, size=14)
+TITLE_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+CURRENT_FILL = PatternFill(start_color="92D050", end_color="92D050", fill_type="solid")
+MAX_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+HEADER_FILL = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+RED_FILL = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
+
+# Named style definitions, registered on a workbook the first time a cell uses them.
+# NamedStyle has no font by default, so the workbook default font is set explicitly.
+NAMED_STYLES = {
+    "header": {"font": HEADER_FONT, "fill": HEADER_FILL},
+    "row_highlight": {"font": DEFAULT_FONT, "fill": RED_FILL},
+}
+
+# (activation threshold column, observed max column) pairs compared for highlighting;
+# both lists come from report_columns, shared with cc_connector, so the names can't drift apart
+THRESHOLD_COLUMN_PAIRS = list(zip(ACTIVATION_COLUMNS, MAX_VALUE_COLUMNS))
 
 
 class ExcelReportFormatter:
-    """Handles Excel report formatting and styling."""
+    """Builds the formatted Excel report in a single streaming pass."""
     
-    def __init__(self, workbook_path: str):
-        """Initialize the formatter with a workbook."""
-        self.wb = load_workbook(workbook_path)
-        self.ws = self.wb.active
+    def __init__(self):
+        """Initialize the formatter with an empty write-only workbook."""
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Sheet1")
+        self._named_styles = set()
     
     def format_report(self, dataframe: pd.DataFrame) -> None:
-        """Apply all formatting to the Excel report."""
-        self._insert_title_row()
-        self._add_section_titles()
-        self._format_section_titles()
-        self._format_header_row()
-        self._highlight_threshold_violations(dataframe)
-        self._auto_adjust_column_widths()
+        """Write the report rows with all formatting applied."""
+        headers = list(dataframe.columns)
+        highlight_mask = self._compute_highlight_mask(dataframe)  # Fails on missing columns before anything is written
+        rows = self._get_data_rows(dataframe)
+        title_values = self._get_title_values()
         
-    def _insert_title_row(self) -> None:
-        """Insert a row at the top for section titles."""
-        self.ws.insert_rows(1)
+        # Write-only sheets emit column widths before any row, so size them first
+        self._auto_adjust_column_widths(dataframe, [title_values, headers])
+        self._add_section_titles()
+        self._add_header_row(headers)
+        self._add_data_rows(rows, highlight_mask)
+    
+    def _get_data_rows(self, dataframe: pd.DataFrame) -> list:
+        """Get the DataFrame rows as plain Python values, with missing values as None."""
+        values = dataframe.astype(object).where(dataframe.notna(), None)
+        return list(values.itertuples(index=False, name=None))
+    
+    def _get_title_values(self) -> list:
+        """Get the section title row values, placed at the first column of each section."""
+        return [None, None, CURRENT_TITLE] + [None] * 7 + [MAX_TITLE]
+    
+    def _get_named_style(self, name: str) -> str:
+        """Register a named style on the workbook on first use and return its name."""
+        if name not in self._named_styles:
+            self.wb.add_named_style(NamedStyle(name, **NAMED_STYLES[name]))
+            self._named_styles.add(name)
+        return name
+    
+    def _create_cell(self, value, font=None, fill=None, alignment=None, style=None) -> WriteOnlyCell:
+        """Create a styled cell for the write-only worksheet."""
+        cell = WriteOnlyCell(self.ws, value=value)
+        if style:
+            cell.style = style
+        if font:
+            cell.font = font
+        if fill:
+            cell.fill = fill
+        if alignment:
+            cell.alignment = alignment
+        return cell
     
     def _add_section_titles(self) -> None:
-        """Add section titles for Current Thresholds and Max Values."""
-        # Merge cells for "Current Thresholds" (columns C to J)
-        self.ws.merge_cells(start_row=1, start_column=3, end_row=1, end_column=10)
-        self.ws.cell(row=1, column=3).value = "Current Thresholds"
+        """Add merged and formatted section titles for Current Thresholds and Max Values."""
+        # Merged ranges are written when the sheet is closed
+        self.ws.merged_cells.add("C1:J1")
+        self.ws.merged_cells.add("K1:R1")
         
-        # Merge cells for "Max value for last 7 days" (columns K to R)
-        self.ws.merge_cells(start_row=1, start_column=11, end_row=1, end_column=18)
-        self.ws.cell(row=1, column=11).value = "Max value for last 7 days"
+        title_row = self._get_title_values()
+        title_row[2] = self._create_cell(CURRENT_TITLE, TITLE_FONT, CURRENT_FILL, TITLE_ALIGNMENT)
+        title_row[10] = self._create_cell(MAX_TITLE, TITLE_FONT, MAX_FILL, TITLE_ALIGNMENT)
+        self.ws.append(title_row)
     
-    def _format_section_titles(self) -> None:
-        """Format the section title cells."""
-        title_font = Font(bold=True, size=14)
-        title_alignment = Alignment(horizontal="center", vertical="center")
+    def _add_header_row(self, headers: list) -> None:
+        """Add the formatted column headers."""
+        header_style = self._get_named_style("header")
+        self.ws.append([self._create_cell(header, style=header_style) for header in headers])
+    
+    def _compute_highlight_mask(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """Flag rows where any configured activation threshold is below 80% of its max value."""
+        activation_columns = [activation for activation, _ in THRESHOLD_COLUMN_PAIRS]
+        max_columns = [maximum for _, maximum in THRESHOLD_COLUMN_PAIRS]
         
-        # Format "Current Thresholds" title
-        current_fill = PatternFill(start_color="92D050", end_color="92D050", fill_type="solid")
-        current_cell = self.ws.cell(row=1, column=3)
-        current_cell.fill = current_fill
-        current_cell.font = title_font
-        current_cell.alignment = title_alignment
+        # Columns are selected directly so a missing one raises instead of disabling highlighting.
+        # Empty, non-numeric and missing values become 0; a threshold of 0 counts as not configured.
+        activation = dataframe[activation_columns].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float)
+        maximum = dataframe[max_columns].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float)
         
-        # Format "Max value for last 7 days" title
-        max_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-        max_cell = self.ws.cell(row=1, column=11)
-        max_cell.fill = max_fill
-        max_cell.font = title_font
-        max_cell.alignment = title_alignment
+        configured = activation > 0
+        return (configured & (activation < maximum * CONFIG.THRESHOLD_PERCENTAGE)).any(axis=1)
     
-    def _format_header_row(self) -> None:
-        """Format the column headers."""
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
+    def _add_data_rows(self, rows: list, highlight_mask: np.ndarray) -> None:
+        """Add data rows, highlighting the rows flagged in the mask."""
+        highlight_style = self._get_named_style("row_highlight") if highlight_mask.any() else None
         
-        for cell in self.ws[2]:  # Row 2 is now the header row
-            cell.font = header_font
-            cell.fill = header_fill
+        for row, highlight in zip(rows, highlight_mask):
+            if highlight:
+                self.ws.append([self._create_cell(value, style=highlight_style) for value in row])
+            else:
+                self.ws.append(row)
     
-    def _highlight_threshold_violations(self, dataframe: pd.DataFrame) -> None:
-        """Highlight rows where activation thresholds are below 80% of max values."""
-        red_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
+    def _auto_adjust_column_widths(self, dataframe: pd.DataFrame, label_rows: list) -> None:
+        """Auto-adjust column widths based on content."""
+        # Size every column that the data or any label row reaches
+        max_lengths = [0] * max([len(dataframe.columns)] + [len(row) for row in label_rows])
         
-        for row_idx in range(3, self.ws.max_row + 1):  # Start from row 3 (first data row)
-            if self._should_highlight_row(row_idx):
-                for col_idx in range(1, len(dataframe.columns) + 1):
-                    self.ws.cell(row=row_idx, column=col_idx).fill = red_fill
-    
-    def _should_highlight_row(self, row_idx: int) -> bool:
-        """Check if a row should be highlighted based on threshold violations."""
-        threshold = CONFIG['THRESHOLD_PERCENTAGE']
+        # Measure the data column-wise with pandas; empty, missing and zero values don't count
+        if not dataframe.empty:
+            filled = dataframe.notna() & dataframe.astype(bool)
+            text = dataframe.where(filled, "").astype(str)
+            data_lengths = text.apply(lambda column: column.str.len()).max()
+            for col_idx, length in enumerate(data_lengths):
+                max_lengths[col_idx] = int(length)
         
-        # Column mapping for comparison: (activation_col, max_col, description)
-        comparisons = [
-            (2, 10, "TCP Activation Mbps vs TCP Max BPS"),     # TCP Mbps
-            (3, 11, "TCP Activation PPS vs TCP Max PPS"),      # TCP PPS
-            (4, 12, "UDP Activation Mbps vs UDP Max BPS"),     # UDP Mbps
-            (5, 13, "UDP Activation PPS vs UDP Max PPS"),      # UDP PPS
-            (6, 14, "ICMP Activation Mbps vs ICMP Max BPS"),   # ICMP Mbps
-            (7, 15, "ICMP Activation PPS vs ICMP Max PPS"),    # ICMP PPS
-            (8, 16, "Total Activation Mbps vs Total Max BPS"), # Total Mbps
-            (9, 17, "Total Activation PPS vs Total Max PPS"),  # Total PPS
-        ]
+        for row in label_rows:
+            for col_idx, value in enumerate(row):
+                if value:
+                    max_lengths[col_idx] = max(max_lengths[col_idx], len(str(value)))
         
-        try:
-            for activation_col, max_col, description in comparisons:
-                activation_val = self._get_cell_value(row_idx, activation_col)
-                max_val = self._get_float_value(row_idx, max_col)
-                
-                # Skip comparison if activation threshold is not configured
-                if self._is_value_not_configured(activation_val):
-                    continue
-                
-                activation_val_float = self._convert_to_float(activation_val)
-                
-                # Only highlight if activation is below threshold percentage of max
-                if activation_val_float < max_val * threshold:
-                    return True
-            return False
-        except Exception as e:
-            print(f"Error in highlighting logic for row {row_idx}: {e}")
-            return False
-    
-    def _is_value_not_configured(self, value) -> bool:
-        """Check if a threshold value is not configured (empty, null, or zero)."""
-        if value in [None, '', 0, '0', 'N/A', 'n/a']:
-            return True
-        try:
-            # Consider very small values as not configured
-            float_val = float(value)
-            return float_val <= 0
-        except (ValueError, TypeError):
-            return True
-    
-    def _get_cell_value(self, row: int, col: int):
-        """Get raw cell value without conversion."""
-        return self.ws.cell(row=row, column=col).value
-    
-    def _convert_to_float(self, value) -> float:
-        """Convert value to float, return 0 if conversion fails."""
-        try:
-            if value in [None, '']:
-                return 0.0
-            return float(value)
-        except (ValueError, TypeError):
-            return 0.0
-    
-    def _get_float_value(self, row: int, col: int) -> float:
-        """Safely get a float value from a cell."""
-        value = self.ws.cell(row=row, column=col).value
-        if value in [None, '']:
-            return 0.0
-        return float(value)
-    
-    def _auto_adjust_column_widths(self) -> None:
-        """Auto-adjust column widths based on content."""
-        for col_idx in range(1, self.ws.max_column + 1):
-            max_length = 0
-            column_letter = get_column_letter(col_idx)
-            
-            for row_idx in range(1, self.ws.max_row + 1):
-                cell = self.ws.cell(row=row_idx, column=col_idx)
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
+        for col_idx, max_length in enumerate(max_lengths, start=1):
             adjusted_width = max_length + 2
-            self.ws.column_dimensions[column_letter].width = adjusted_width
+            self.ws.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
     
-    def save(self, filename: str) -> None:
-        """Save the formatted workbook."""
-        self.wb.save(filename)
\ No newline at end of file
+    def save(self, filename: str) -> bytes:
+        """Save the formatted workbook with a single write to disk and return its bytes."""
+        # Build the zip archive in memory so the file gets one write instead of many small ones
+        buffer = io.BytesIO()
+        self.wb.save(buffer)
+        report_bytes = buffer.getvalue()
+        with open(filename, "wb") as report_file:
+            report_file.write(report_bytes)
+        return report_bytes
\ No newline at end of file
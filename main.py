@@ -5,20 +5,17 @@ This script connects to a Cyber Controller, retrieves protected object flow dete
 thresholds and maximum values, then generates a formatted Excel report with analysis.
 """
 
-import urllib3
 from utils import collect_data, generate_filename, create_excel_report, send_email_report
-from email_utils import test_email_configuration
-from config import CONFIG
-
-# Disable SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from config_loader import CONFIG
 
 
 def main():
     """Main function to orchestrate the report generation."""
     try:
         # Test email configuration if email is enabled
-        if CONFIG['EMAIL_ENABLED']:
+        if CONFIG.EMAIL_ENABLED:
+            from email_utils import test_email_configuration
+            
             print("Testing email configuration...")
             if not test_email_configuration():
                 print("Email configuration test failed. Proceeding with report generation only.")
@@ -34,19 +31,19 @@ def main():
         # Generate timestamped filename
         filename = generate_filename()
         
-        # Create and format Excel report
-        create_excel_report(df, filename)
+        # Create and format Excel report; keep its bytes so the email needn't reread the file
+        report_bytes = create_excel_report(df, filename)
         
         print(f"\nReport generation completed successfully!")
         print(f"Report saved as: {filename}")
         
         # Send email if enabled and configured
-        if CONFIG['EMAIL_ENABLED']:
+        if CONFIG.EMAIL_ENABLED:
             total_pos = len(df)
-            email_success = send_email_report(filename, total_pos)
+            email_success = send_email_report(filename, total_pos, report_bytes)
             
             if email_success:
-                print(f"Report emailed to: {', '.join(CONFIG['EMAIL_TO'])}")
+                print(f"Report emailed to: {', '.join(CONFIG.EMAIL_TO)}")
             else:
                 print("Email sending failed, but report file is available locally.")
         else:
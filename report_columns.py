@@ -0,0 +1,7 @@
+"""
+Report column names shared by the CC connector and the Excel formatter.
+"""
+
+PROTOCOLS = ["tcp", "udp", "icmp", "total"]
+ACTIVATION_COLUMNS = [f"{protocol} Activation {unit}" for protocol in ("TCP", "UDP", "ICMP", "Total") for unit in ("Mbps", "PPS")]
+MAX_VALUE_COLUMNS = [f"{protocol.upper()} Max {unit}" for protocol in PROTOCOLS for unit in ("Mbps", "PPS")]
@@ -2,12 +2,16 @@
 Utility functions for data collection and report generation.
 """
 
-import pandas as pd
+from __future__ import annotations
+
 from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 from cc_connector import CcConnector
-from excel_formatter import ExcelReportFormatter
-from email_utils import send_report_email
-from config import CONFIG
+from config_loader import CONFIG
+
+# pandas, the Excel formatter and email utils are imported where they are used to keep startup fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def collect_data() -> pd.DataFrame:
@@ -15,23 +19,21 @@ def collect_data() -> pd.DataFrame:
     print("Connecting to Cyber Controller...")
     cc = CcConnector()
     
-    print("Retrieving protected objects...")
-    df = cc.get_protected_objects()
-    
-    if df.empty:
-        print("No protected objects found or error occurred.")
-        return df
-    
-    print(f"Found {len(df)} protected objects. Retrieving maximum values...")
-    
-    # Get max values for each protected object
-    for idx, po_name in enumerate(df["PO Name"]):
-        print(f"Processing {idx + 1}/{len(df)}: {po_name}")
-        max_df = cc.get_max_values_for_po(po_name)
+    try:
+        print("Retrieving protected objects...")
+        df = cc.get_protected_objects()
         
-        if not max_df.empty:
-            for col in max_df.columns:
-                df.loc[df["PO Name"] == po_name, col] = max_df.iloc[0][col]
+        if df.empty:
+            print("No protected objects found or error occurred.")
+            return df
+        
+        print(f"Found {len(df)} protected objects. Retrieving maximum values...")
+        
+        # Get max values for all protected objects in one batch and join them by name
+        max_df = cc.get_max_values_for_all_pos(df["PO Name"])
+        df = df.merge(max_df, on="PO Name", how="left")
+    finally:
+        cc.close()
     
     return df
 
@@ -39,32 +41,34 @@ def collect_data() -> pd.DataFrame:
 def generate_filename() -> str:
     """Generate a timestamped filename."""
     current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    return f"{CONFIG['OUTPUT_FILENAME_PREFIX']}_{current_time}.xlsx"
+    return f"{CONFIG.OUTPUT_FILENAME_PREFIX}_{current_time}.xlsx"
 
 
-def create_excel_report(dataframe: pd.DataFrame, filename: str) -> None:
-    """Create and format the Excel report."""
-    print(f"Creating Excel report: {filename}")
+def create_excel_report(dataframe: pd.DataFrame, filename: str) -> bytes:
+    """Create and format the Excel report, returning the saved file contents."""
+    from excel_formatter import ExcelReportFormatter
     
-    # Save DataFrame to Excel
-    dataframe.to_excel(filename, index=False, engine='openpyxl')
+    print(f"Creating Excel report: {filename}")
     
-    # Apply formatting
-    formatter = ExcelReportFormatter(filename)
+    # Build the formatted workbook in one pass and write it once
+    formatter = ExcelReportFormatter()
     formatter.format_report(dataframe)
-    formatter.save(filename)
+    report_bytes = formatter.save(filename)
     
     print(f"Data saved to {filename} with formatting")
+    return report_bytes
 
 
-def send_email_report(filename: str, total_pos: int) -> bool:
+def send_email_report(filename: str, total_pos: int, report_bytes: Optional[bytes] = None) -> bool:
     """Send the generated report via email."""
-    if not CONFIG['EMAIL_ENABLED']:
+    if not CONFIG.EMAIL_ENABLED:
         print("Email sending is disabled.")
         return False
     
+    from email_utils import send_report_email
+    
     print("Sending email with report attachment...")
-    success = send_report_email(filename, total_pos)
+    success = send_report_email(filename, total_pos, report_bytes)
     
     if success:
         print("Email sent successfully!")